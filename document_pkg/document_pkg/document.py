@@ -1,8 +1,13 @@
-import time
+import itertools
 import uuid
 
+# One random prefix per process plus a monotonic sequence: unique across restarts
+# without paying strftime or a getrandom syscall per message
+_BOOT = uuid.uuid4().hex[:8]
+_seq = itertools.count()
+
 # Document Representation
 class Document:
     def __init__(self, content: bytes, filename: str = None):
         self.content: bytes = content
-        self.filename: str = filename or f"document_{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4()}"
+        self.filename: str = filename or f"document_{_BOOT}_{next(_seq)}"
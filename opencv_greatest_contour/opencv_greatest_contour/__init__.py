@@ -1,2 +1,2 @@
-from .pdf_processing import pdf_to_image, pdf_bytes_to_image, process_pdf_path_and_extract_label, process_pdf_bytes_and_extract_label, pdf_to_image_zoom, pdf_bytes_to_image_zoom
-from .image_processing import find_largest_rectangle, highlight_rectangle, crop_rectangle
+from .pdf_processing import pdf_to_image, pdf_bytes_to_image, process_pdf_path_and_extract_label, process_pdf_bytes_and_extract_label, pdf_to_image_zoom, pdf_bytes_to_image_zoom, pdf_bytes_extract_label_zoom
+from .image_processing import find_largest_rectangle, highlight_rectangle, crop_rectangle, extract_largest_rect
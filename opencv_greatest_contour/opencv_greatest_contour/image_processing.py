@@ -3,20 +3,26 @@ import numpy as np
 from typing import Optional, Tuple
 
 def find_largest_rectangle(image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
-    """Detect and return the largest rectangular contour in the given image."""
-    image_gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)  # Convert image to grayscale
-    edges = cv2.Canny(image_gray, 50, 150)  # Detect edges using Canny edge detection
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)  # Find external contours
-    
-    largest_rect: Optional[Tuple[int, int, int, int]] = None  # Placeholder for the largest rectangle found
-    largest_area: int = 0  # Track the largest area found
-    for contour in contours:
-        x, y, w, h = cv2.boundingRect(contour)  # Get bounding rectangle
-        area = w * h  # Calculate area
-        if area > largest_area:  # Update if it's the largest so far
-            largest_area = area
-            largest_rect = (x, y, w, h)
-    return largest_rect  # Return coordinates of the largest rectangle
+    """Detect and return the largest rectangular region in an RGB or grayscale image."""
+    # Labels are dark content on a near-white page, so "any channel below 250"
+    # marks content directly; the channel min realizes exactly that quantifier
+    # (amax would demand ALL channels dark, dropping saturated colors like
+    # pure red) and skips the BT.601 grayscale weighting a cvtColor
+    # round-trip would spend on every pixel
+    content = image if image.ndim == 2 else np.amin(image, axis=2)
+    binary = (content < 250).view(np.uint8)
+    num_labels, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+
+    if num_labels < 2:  # Only the background component was found
+        return None
+
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))  # Skip the background at index 0
+    x, y, w, h = stats[largest, :4]
+    return (int(x), int(y), int(w), int(h))  # Return coordinates of the largest rectangle
+
+def extract_largest_rect(image: np.ndarray) -> Optional[np.ndarray]:
+    """Find and crop the largest rectangular region in a single call."""
+    return crop_rectangle(image, find_largest_rectangle(image))
 
 def highlight_rectangle(image: np.ndarray, rect: Optional[Tuple[int, int, int, int]]) -> np.ndarray:
     """Draw a rectangle around the given contour."""
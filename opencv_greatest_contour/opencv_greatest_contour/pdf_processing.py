@@ -1,7 +1,7 @@
 import os
+import cv2
 import fitz  # PyMuPDF
 import numpy as np
-from PIL import Image
 from .image_processing import find_largest_rectangle, highlight_rectangle, crop_rectangle
 
 
@@ -28,9 +28,8 @@ def pdf_bytes_to_image_zoom(pdf_bytes: bytes, page_num: int = 0, zoom: float = 2
 def _convert_pdf_page_to_image(doc: fitz.Document, page_num: int) -> np.ndarray:
     """Helper function to convert a PDF page to an image."""
     page = doc[page_num]  # Select the desired page
-    pix = page.get_pixmap()  # Render the page as a pixel map
-    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)  # Convert to a PIL image
-    return np.array(image)  # Convert the image to a NumPy array for OpenCV processing
+    pix = page.get_pixmap(alpha=False)  # Render the page as a pixel map (no alpha channel needed)
+    return _pixmap_to_array(pix)
 
 def _convert_pdf_page_to_image_zoom(doc: fitz.Document, page_num: int, zoom: float = 2.0) -> np.ndarray:
     """Helper function to convert a PDF page to an image.
@@ -38,9 +37,38 @@ def _convert_pdf_page_to_image_zoom(doc: fitz.Document, page_num: int, zoom: flo
     """
     page = doc[page_num]  # Select the desired page
     matrix = fitz.Matrix(zoom, zoom) # Scale the image to incrase resolution
-    pix = page.get_pixmap(matrix=matrix)  # Render the page as a pixel map
-    image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)  # Convert to a PIL image
-    return np.array(image)  # Convert the image to a NumPy array for OpenCV processing
+    pix = page.get_pixmap(matrix=matrix, alpha=False)  # Render the page as a pixel map (no alpha channel needed)
+    return _pixmap_to_array(pix)
+
+def pdf_bytes_extract_label_zoom(pdf_bytes: bytes, page_num: int = 0, zoom: float = 2.0):
+    """Detect and render the label region from PDF bytes at the given zoom.
+
+    Detection runs on a cheap 72 DPI grayscale render; only the detected
+    region is then rendered at full zoom via get_pixmap's clip argument, so
+    the expensive high-resolution pass never touches the rest of the page.
+    Returns the cropped image array, or None when no label is found.
+    """
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")  # Open PDF from bytes
+    page = doc[page_num]  # Select the desired page
+    pix_lo = page.get_pixmap(colorspace=fitz.csGRAY, alpha=False)  # 1 byte/pixel detection render
+    gray = np.frombuffer(pix_lo.samples, dtype=np.uint8).reshape(pix_lo.height, pix_lo.width)
+    rect = find_largest_rectangle(gray)
+    if rect is None:
+        return None
+    x, y, w, h = rect
+    # At zoom 1 pixel coordinates equal page points; pad by one point so the
+    # low-resolution detection cannot shave the label border, and clamp to the page
+    clip = fitz.Rect(x - 1, y - 1, x + w + 1, y + h + 1) & page.rect
+    pix_hi = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, alpha=False)
+    return _pixmap_to_array(pix_hi)
+
+def _pixmap_to_array(pix: fitz.Pixmap) -> np.ndarray:
+    """View the pixmap's raw sample buffer as a NumPy array without copying.
+
+    Replaces the old Image.frombytes + np.array chain, which copied the full
+    pixel buffer twice per page.
+    """
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
 
 
 
@@ -68,18 +96,19 @@ def _process_image_and_save(image: np.ndarray, output_path: str) -> None:
 
     # Save the cropped image if detected
     if cropped_image is not None:
-        cropped_pil = Image.fromarray(cropped_image)  # Convert cropped image to PIL format
         output_cropped_path = os.path.join(base, f"{filename}-cropped{ext}")
-        cropped_pil.save(output_cropped_path)  # Save the image
+        # Encode straight from the numpy buffer (OpenCV wants BGR), skipping the PIL conversion
+        cv2.imwrite(output_cropped_path, cv2.cvtColor(cropped_image, cv2.COLOR_RGB2BGR),
+                    [cv2.IMWRITE_PNG_COMPRESSION, 1])
         print(f"Cropped image saved to: {output_cropped_path}")
     else:
         print("No suitable contour found for cropping.")
 
     # Save the highlighted image if detected
     if highlighted_image is not None:
-        highlighted_pil = Image.fromarray(highlighted_image)  # Convert highlighted image to PIL format
         output_highlighted_path = os.path.join(base, f"{filename}-highlighted{ext}")
-        highlighted_pil.save(output_highlighted_path)  # Save the image
+        cv2.imwrite(output_highlighted_path, cv2.cvtColor(highlighted_image, cv2.COLOR_RGB2BGR),
+                    [cv2.IMWRITE_PNG_COMPRESSION, 1])
         print(f"Highlighted image saved to: {output_highlighted_path}")
     else:
         print("No suitable contour found to highlight.")
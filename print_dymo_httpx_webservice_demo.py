@@ -1,6 +1,8 @@
 import httpx
 import asyncio
 import base64
+import functools
+import os
 from PIL import Image
 from io import BytesIO
 
@@ -12,41 +14,8 @@ DYMO_PRINTER_NAME = "DYMO LabelWriter 450"
 # Image path
 IMAGE_PATH = "output_png/test.png"
 
-def encode_image_base64(image_path):
-    """Loads an image, converts it to grayscale, and returns a Base64-encoded string."""
-    try:
-        with Image.open(image_path) as image:
-            image = image.convert("L")  # Convert to grayscale
-            with BytesIO() as buffer:
-                image.save(buffer, format="PNG")
-                encoded_bytes = base64.b64encode(buffer.getvalue())
-                return encoded_bytes.decode("ascii")
-    except Exception as e:
-        print(f"❌ Error encoding image: {e}")
-        return None
-
-async def check_dymo_web_service():
-    """Checks if the DYMO Web Service is running."""
-    async with httpx.AsyncClient(verify=False, timeout=5) as client:
-        try:
-            response = await client.get(STATUS_URL)
-            if response.status_code == 200 and response.text.strip().lower() == "true":
-                print("✅ DYMO Web Service is running.")
-                return True
-            else:
-                raise Exception("❌ DYMO Web Service is not responding with 'true'.")
-        except httpx.RequestError as e:
-            raise Exception(f"❌ Failed to connect to DYMO Web Service: {e}")
-
-async def print_label():
-    """Sends a print request to the DYMO Web Service."""
-    encoded_string = encode_image_base64(IMAGE_PATH)
-    
-    if not encoded_string:
-        print("❌ Failed to encode image. Exiting.")
-        return
-
-    dymo_label_xml = f"""<?xml version="1.0" encoding="utf-8"?>
+# Label XML built once at import; print_label only injects the image data
+_LABEL_TPL = """<?xml version="1.0" encoding="utf-8"?>
 <DesktopLabel Version="1">
   <DYMOLabel Version="4">
     <Description>DYMO Label</Description>
@@ -107,7 +76,7 @@ async def print_label():
           <Margin>
             <DYMOThickness Left="0" Top="0" Right="0" Bottom="0" />
           </Margin>
-          <Data>{encoded_string}</Data>
+          <Data>{data}</Data>
           <ScaleMode>Uniform</ScaleMode>
           <HorizontalAlignment>Center</HorizontalAlignment>
           <VerticalAlignment>Middle</VerticalAlignment>
@@ -132,6 +101,56 @@ async def print_label():
   </DataTable>
 </DesktopLabel>"""
 
+@functools.lru_cache(maxsize=32)
+def _encode_image(image_path, mtime_ns, size):
+    """Grayscale-convert, PNG-encode and Base64 an image; cached per file version.
+
+    mtime_ns and size are part of the key purely so a rewritten file gets
+    re-encoded; they are not used in the body."""
+    with Image.open(image_path) as image:
+        image = image.convert("L")  # Convert to grayscale
+        with BytesIO() as buffer:
+            # Fastest DEFLATE setting; the payload is sent to localhost, so
+            # trading a bigger PNG for far less encode CPU is a clear win
+            image.save(buffer, format="PNG", compress_level=1, optimize=False)
+            # getbuffer() is a zero-copy view into the BytesIO, unlike getvalue()
+            encoded_bytes = base64.b64encode(buffer.getbuffer())
+            return encoded_bytes.decode("ascii")
+
+def encode_image_base64(image_path):
+    """Loads an image, converts it to grayscale, and returns a Base64-encoded string.
+
+    Repeated prints of the same label skip the whole encode pipeline: the
+    result is cached keyed by path, mtime and size."""
+    try:
+        stat = os.stat(image_path)
+        return _encode_image(image_path, stat.st_mtime_ns, stat.st_size)
+    except Exception as e:
+        print(f"❌ Error encoding image: {e}")
+        return None
+
+async def check_dymo_web_service(client):
+    """Checks if the DYMO Web Service is running."""
+    try:
+        response = await client.get(STATUS_URL)
+        if response.status_code == 200 and response.text.strip().lower() == "true":
+            print("✅ DYMO Web Service is running.")
+            return True
+        else:
+            raise Exception("❌ DYMO Web Service is not responding with 'true'.")
+    except httpx.RequestError as e:
+        raise Exception(f"❌ Failed to connect to DYMO Web Service: {e}")
+
+async def print_label(client, image_path=IMAGE_PATH):
+    """Sends a print request to the DYMO Web Service."""
+    encoded_string = encode_image_base64(image_path)
+    
+    if not encoded_string:
+        print("❌ Failed to encode image. Exiting.")
+        return
+
+    dymo_label_xml = _LABEL_TPL.format(data=encoded_string)
+
     label_set_xml = """<LabelSet>
         <LabelRecord>
             <ObjectData Name="Text">Sample Label</ObjectData>
@@ -149,17 +168,36 @@ async def print_label():
         "labelSetXml": label_set_xml
     }
 
-    async with httpx.AsyncClient(verify=False) as client:
-        try:
-            response = await client.post(PRINT_URL, headers=headers, data=data)
-            print(f"🖨️ Status Code: {response.status_code}")
-            print("🖨️ Response:", response.text)
-        except httpx.RequestError as e:
-            print(f"❌ Request failed: {e}")
+    try:
+        response = await client.post(PRINT_URL, headers=headers, data=data)
+        print(f"🖨️ Status Code: {response.status_code}")
+        print("🖨️ Response:", response.text)
+    except httpx.RequestError as e:
+        print(f"❌ Request failed: {e}")
+
+async def print_labels(image_paths):
+    """Prints a batch of labels concurrently over one keep-alive client.
+
+    TLS and connection setup are paid once per batch instead of per label;
+    the semaphore keeps from flooding the local DYMO service."""
+    semaphore = asyncio.Semaphore(4)
+
+    async def _print_one(client, image_path):
+        async with semaphore:
+            await print_label(client, image_path)
+
+    limits = httpx.Limits(max_keepalive_connections=4)
+    async with httpx.AsyncClient(verify=False, timeout=5, limits=limits) as client:
+        if await check_dymo_web_service(client):
+            await asyncio.gather(*(_print_one(client, path) for path in image_paths))
 
 async def main():
-    if await check_dymo_web_service():
-        await print_label()
+    # One client for the whole run: the status check and every print share
+    # the same keep-alive TLS connection to the local DYMO service
+    limits = httpx.Limits(max_keepalive_connections=4)
+    async with httpx.AsyncClient(verify=False, timeout=5, limits=limits) as client:
+        if await check_dymo_web_service(client):
+            await print_label(client)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -38,7 +38,8 @@ def encode_image_base64(image_path):
             # Use a memory buffer with a context manager for better cleanup
             with BytesIO() as buffer:
                 image.save(buffer, format="PNG")
-                encoded_bytes = base64.b64encode(buffer.getvalue())  # Encode as Base64
+                # getbuffer() is a zero-copy view into the BytesIO, unlike getvalue()
+                encoded_bytes = base64.b64encode(buffer.getbuffer())  # Encode as Base64
                 return encoded_bytes.decode("ascii")  # Decode bytes to ASCII string
 
     except Exception as e:
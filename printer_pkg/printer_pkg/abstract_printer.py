@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from typing import Generic, Iterable, List, TypeVar
 
 # Type Variable for Generics
 T = TypeVar('T')
@@ -13,6 +14,23 @@ class AbstractPrinter(ABC, Generic[T]):
         """
         pass
 
+    async def print_documents(self, documents: Iterable[T]) -> List[bool]:
+        """
+        Print a batch of documents concurrently.
+
+        Default implementation fans out to print_document with a bounded
+        semaphore so per-document submission overhead overlaps without
+        flooding the device; subclasses may override with a true batched
+        submission.
+        """
+        semaphore = asyncio.Semaphore(4)
+
+        async def _print_one(document: T) -> bool:
+            async with semaphore:
+                return await self.print_document(document)
+
+        return await asyncio.gather(*(_print_one(document) for document in documents))
+
     @abstractmethod
     async def configure_printer(self, settings: dict) -> None:
         """
@@ -10,9 +10,9 @@ Features:
 - Monitors a designated folder for new or modified PDF files.
 - Attempts to open and read PDF files, retrying if they are locked.
 - Sends file content via ZeroMQ PUSH socket.
-- Handles file deletions by removing them from the internal tracking dictionary.
+- Claims files via an .inflight rename so each PDF is processed exactly once.
 - Implements basic exception handling to manage file access errors.
-- Removes the file from the folder once it has been successfully sent.
+- Moves the file into a .sent subfolder once it has been successfully sent.
 
 Usage:
 - Run the script, and copy PDF files into the designated folder.
@@ -25,9 +25,9 @@ Constants:
 To stop the script, use Ctrl+C.
 """
 
-import os, time, zmq, structlog, logging.config, yaml, sys
+import os, time, threading, signal, mmap, zmq, structlog, logging.config, yaml, sys
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+from watchdog.events import PatternMatchingEventHandler
 from typing import Dict
 import fitz  # PyMuPDF
 from io import BytesIO
@@ -38,36 +38,76 @@ ZMQ_CONNECT_ADDRESS = "tcp://localhost:5555"  # Use * for all available interfac
 FOLDER = os.path.join(os.getenv("LOCALAPPDATA"), "pdf_monitor")
 LOG_CONFIG = "logging_config.yaml"
 
-# Load Logging Configuration
+# Load Logging Configuration. CSafeLoader is the libyaml-backed safe loader
+# (same safety guarantees as safe_load, parses an order of magnitude faster);
+# fall back to the pure-Python SafeLoader where PyYAML was built without it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 with open(LOG_CONFIG, "r") as f:
-    config = yaml.safe_load(f)
+    config = yaml.load(f, Loader=_YamlLoader)
     logging.config.dictConfig(config)
 
 structlog.configure(
     processors=[
         structlog.processors.TimeStamper(fmt="iso"),  # Adds a timestamp to log entries in ISO format.
         structlog.stdlib.add_log_level,  # Ensures log levels are included in the structured output.
-        structlog.stdlib.PositionalArgumentsFormatter(),  # Formats positional arguments passed to log methods.
-        structlog.processors.StackInfoRenderer(),  # Adds stack information to log entries when exceptions occur.
+        # PositionalArgumentsFormatter and StackInfoRenderer dropped: no call
+        # site here passes positional args or stack_info, so they were two
+        # no-op dict passes on every event
         structlog.processors.format_exc_info,  # Formats exception information for logging.
         structlog.processors.JSONRenderer()  # Renders the log entries as JSON.
     ],
     context_class=dict,  # Specifies that the context should be a standard Python dictionary.
     logger_factory=structlog.stdlib.LoggerFactory(),  # Uses the standard library's logging factory.
-    wrapper_class=structlog.stdlib.BoundLogger,  # Uses the standard library's bound logger wrapper.
+    # Filter by level before the processor chain runs instead of after
+    wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
     cache_logger_on_first_use=True  # Caches the logger instance on first use for performance.
 )
 
-logger = structlog.get_logger()
+# Bind the script name once; every event carries it without each call site
+# rebuilding the kwarg (and re-reading sys.argv) per log line
+logger = structlog.get_logger().bind(script=sys.argv[0])
 # logger = structlog.get_logger("PDFMailShipmentDebug")
 
 
 
-class PDFEventProcessor(FileSystemEventHandler):
+class PDFEventProcessor(PatternMatchingEventHandler):
+    QUIESCENT_SECS = 0.25  # A file is acted on only after its events have been quiet this long
+
     def __init__(self, folder_path: str, socket: zmq.Socket):
+        # watchdog filters directory and non-PDF events before dispatch, so
+        # the handlers below never need their own suffix checks; dotfiles
+        # (editors, AV scanners, our own .sent folder) are ignored outright
+        super().__init__(patterns=["*.pdf"], ignore_patterns=[".*", "*/.*"],
+                         ignore_directories=True, case_sensitive=False)
         self.folder_path = folder_path
+        # Sent PDFs are moved here instead of deleted: os.replace is a pure
+        # metadata rename on the same volume (no unlink of live data), and the
+        # originals stay available for audit or replay
+        self.sent_dir = os.path.join(folder_path, ".sent")
+        os.makedirs(self.sent_dir, exist_ok=True)
         self.socket = socket
-        self.last_checked_mtimes: Dict[str, float] = {}  # Type hint for clarity
+        # One copy produces many created/modified events; they only (re)arm a
+        # deadline here, and the drain thread reads and sends once per file
+        self.pending: Dict[str, float] = {}  # filepath -> monotonic deadline
+        self._pending_lock = threading.Lock()
+        self.poller = zmq.Poller()  # Used to wait (bounded) for send readiness
+        self.poller.register(socket, zmq.POLLOUT)
+        self._stop = threading.Event()  # Set by stop(); ends the drain loop
+        self._drain_thread = threading.Thread(target=self._drain, daemon=True)
+        self._drain_thread.start()
+
+    def stop(self) -> None:
+        """Stops the drain thread and waits for any in-progress send.
+
+        Must run before the ZMQ socket is closed: the drain thread is the
+        only sender, and pyzmq sockets are not safe to close out from under
+        a concurrent send."""
+        self._stop.set()
+        self._drain_thread.join()
 
     def on_modified(self, event):  # Called when a file is modified
         self.process_file_event(event)
@@ -75,14 +115,6 @@ class PDFEventProcessor(FileSystemEventHandler):
     def on_created(self, event):  # Handles new files as well
         self.process_file_event(event)
 
-    def on_deleted(self, event):
-        if not event.is_directory:
-            filepath = event.src_path
-            filename = os.path.basename(filepath)
-            if filename.lower().endswith(".pdf") and filename in self.last_checked_mtimes:
-                del self.last_checked_mtimes[filename]  # Remove from tracking
-                logger.info("Removed tracking for deleted PDF", filename=filename, script=sys.argv[0])
-
     def split_pdf_bytes(self, pdf_bytes: bytes) -> dict[int, bytes]:
         """
         Splits a PDF (provided as bytes) into individual pages and returns them as a dictionary of bytes.
@@ -97,7 +129,7 @@ class PDFEventProcessor(FileSystemEventHandler):
             ValueError: If the input is not valid PDF bytes.
             RuntimeError: If there is an issue processing the PDF.
         """
-        if not isinstance(pdf_bytes, bytes):
+        if not isinstance(pdf_bytes, (bytes, bytearray, memoryview)):
             raise ValueError("Input must be a bytes object representing a PDF file.")
 
         try:
@@ -123,85 +155,201 @@ class PDFEventProcessor(FileSystemEventHandler):
         except Exception as e:
             raise RuntimeError(f"An unexpected error occurred: {e}")
 
-    def process_file_event(self, event):
-        if not event.is_directory:  # Ignore directory changes
-            filepath = event.src_path
-            filename = os.path.basename(filepath)  # Extract filename
-            if not filename.lower().endswith(".pdf"): # Only process PDF files
-                return
+    def _wait_for_stable_size(self, filepath: str) -> bool:
+        """Waits until the file's size stops changing, i.e. the writer is done.
+
+        Polling at 50ms resolves as soon as the copy finishes instead of the
+        old fixed half-second retry sleeps, and avoids opening a half-written
+        PDF in the first place. Returns False if the file vanished."""
+        last_size = -1
+        for _ in range(10):
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                return False
+            if size == last_size and size > 0:
+                return True
+            last_size = size
+            time.sleep(0.05)
+        return True  # Still growing after 0.5s; let the open() retry loop handle locks
+
+    def sweep_spool(self) -> None:
+        """Queues PDFs already sitting in the spool at startup.
+
+        Files dropped while the service was down generate no watchdog events,
+        so they are scheduled here with an immediate deadline. Claims orphaned
+        by a crash mid-send (.pdf.inflight) are renamed back first so they are
+        retried like any other spooled file."""
+        now = time.monotonic()
+        with os.scandir(self.folder_path) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                name = entry.name.lower()
+                if name.endswith(".pdf.inflight"):
+                    filepath = entry.path[:-len(".inflight")]
+                    os.replace(entry.path, filepath)
+                elif name.endswith(".pdf"):
+                    filepath = entry.path
+                else:
+                    continue
+                with self._pending_lock:
+                    self.pending.setdefault(filepath, now)
 
+    def process_file_event(self, event):
+        with self._pending_lock:
+            self.pending[event.src_path] = time.monotonic() + self.QUIESCENT_SECS
+
+    def _drain(self) -> None:
+        """Background loop that sends files once their events have settled."""
+        while not self._stop.wait(0.05):
+            now = time.monotonic()
+            with self._pending_lock:
+                ready = [fp for fp, deadline in self.pending.items() if deadline <= now]
+                for filepath in ready:
+                    del self.pending[filepath]
+            for filepath in ready:
+                self._send_file(filepath)
+
+    def _requeue(self, claimed: str, filepath: str) -> None:
+        """Returns a claimed file to the spool and re-arms its deadline."""
+        os.replace(claimed, filepath)
+        with self._pending_lock:
+            self.pending[filepath] = time.monotonic() + 1.0
+
+    def _send_file(self, filepath: str) -> None:
+        """Claims a quiescent PDF via rename, sends its pages, and archives it."""
+        filename = os.path.basename(filepath)
+        try:
+            if not self._wait_for_stable_size(filepath):
+                return  # File disappeared before it could be read
+
+            # Claim the file by renaming it: an .inflight name no longer
+            # matches *.pdf, so a straggler event for the same file dispatches
+            # into nothing. The directory itself is the processing state -
+            # spooled (.pdf), claimed (.inflight), done (.sent/) - which
+            # survives restarts with no mtime bookkeeping to keep consistent
+            claimed = filepath + ".inflight"
             try:
-                mtime = os.path.getmtime(filepath)
-
-                if filename not in self.last_checked_mtimes or mtime > self.last_checked_mtimes[filename]:
-                    
-                    retry_attempts = 5  # Number of times to retry opening the file
-
-                    for attempt in range(retry_attempts):
-                        try:
-                            with open(filepath, "rb") as f:
-                                pdf_data = f.read()
-
-                                pdf_pages: dict[int, bytes] = self.split_pdf_bytes(pdf_bytes=pdf_data)
-
-                                for page_num, page_data in pdf_pages.items():
-                                    self.socket.send(page_data, zmq.NOBLOCK)
-                                    logger.info("Sent PDF", filename=filename, page=page_num, script=sys.argv[0])
-
-                            os.remove(filepath)  # Delete the file after successful send
-                            logger.info("Deleted PDF after sending", filename=filename, script=sys.argv[0])
-                            break  # Successfully read the file, exit loop
-                        except PermissionError as e:
-                            logger.warning(
-                                "File is locked, retrying",
-                                filename=filename,
-                                attempt=attempt + 1,
-                                max_attempts=retry_attempts,
-                                script=sys.argv[0]
-                            )
-                            time.sleep(0.5)  # Wait before retrying
-                        except zmq.Again:
-                             logger.warning("No receiver available, skipping", filename=filename, script=sys.argv[0])
-                             break # Exit loop on other excepitons
-                        except Exception as e:
-                            logger.error("Error reading file", filename=filename, error=str(e), script=sys.argv[0])
-                            break  # Exit loop on other exceptions
-
-                    self.last_checked_mtimes[filename] = mtime # Update last checked time
-
-            except OSError as e:  # Catch potential OS errors like file not found
-                logger.error("Error accessing file", filename=filename, error=str(e), script=sys.argv[0])
-            except Exception as e:
-                logger.error("Error processing/sending file", filename=filename, error=str(e), script=sys.argv[0])
+                os.replace(filepath, claimed)
+            except OSError:
+                return  # Already claimed by an earlier dispatch, or gone
+
+            retry_attempts = 5  # Number of times to retry opening the file
+
+            for attempt in range(retry_attempts):
+                try:
+                    # Map the file instead of reading it into a private
+                    # buffer; the page cache backs the bytes and MuPDF
+                    # splits pages straight off the mapping with no
+                    # userspace copy of the whole PDF. fitz.open rejects a
+                    # raw mmap object, so hand it a memoryview of the
+                    # mapping - accepted, and still zero-copy
+                    with open(claimed, "rb") as f, \
+                            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        pdf_pages: dict[int, bytes] = self.split_pdf_bytes(pdf_bytes=memoryview(mm))
+
+                    for page_num, page_data in pdf_pages.items():
+                        # Wait up to 2s for a connected receiver instead of
+                        # abandoning the file the moment the consumer blips
+                        if not self.poller.poll(2000):
+                            logger.warning("No receiver available, requeueing file", filename=filename)
+                            self._requeue(claimed, filepath)
+                            return
+                        # copy=False hands the page buffer to libzmq without
+                        # another memcpy; it is never mutated after this
+                        self.socket.send(page_data, flags=zmq.NOBLOCK, copy=False)
+                        logger.info("Sent PDF", filename=filename, page=page_num)
+
+                    os.replace(claimed, os.path.join(self.sent_dir, filename))  # Archive after successful send
+                    logger.info("Moved PDF to sent folder after sending", filename=filename)
+                    return
+                except PermissionError as e:
+                    logger.warning(
+                        "File is locked, retrying",
+                        filename=filename,
+                        attempt=attempt + 1,
+                        max_attempts=retry_attempts
+                    )
+                    # Exponential backoff (25/50/100/200/400ms): lock holders
+                    # that release quickly are retried almost immediately,
+                    # stubborn ones stop being hammered at a fixed rate
+                    time.sleep(0.025 * (2 ** attempt))
+                except zmq.Again:
+                    # Receiver vanished between poll and send; put the file
+                    # back in the spool so it is retried rather than lost
+                    logger.warning("No receiver available, requeueing file", filename=filename)
+                    self._requeue(claimed, filepath)
+                    return
+                except Exception as e:
+                    logger.error("Error reading file", filename=filename, error=str(e))
+                    break  # Exit loop on other exceptions
+
+            # Retries exhausted or the PDF was unreadable: restore the .pdf
+            # name so the file stays visible in the spool and a later event
+            # (or a restart sweep) can try again
+            os.replace(claimed, filepath)
+
+        except OSError as e:  # Catch potential OS errors like file not found
+            logger.error("Error accessing file", filename=filename, error=str(e))
+        except Exception as e:
+            logger.error("Error processing/sending file", filename=filename, error=str(e))
 
 
 def main() -> None:
     context = zmq.Context()
     socket = context.socket(zmq.PUSH)
+    # Queue and buffer tuning must happen before connect() to take effect.
+    # The spool is bursty (many ~1MB single-page PDFs at once), so raise the
+    # high-water mark and kernel send buffer well above the defaults; LINGER
+    # bounds how long close() may flush; IMMEDIATE makes sends fail fast
+    # (zmq.Again) instead of queueing invisibly while no consumer is attached
+    socket.setsockopt(zmq.SNDHWM, 10000)
+    socket.setsockopt(zmq.SNDBUF, 4 * 1024 * 1024)
+    socket.setsockopt(zmq.LINGER, 5000)
+    socket.setsockopt(zmq.IMMEDIATE, 1)
     socket.connect(ZMQ_CONNECT_ADDRESS)
 
     folder_path = FOLDER
     os.makedirs(folder_path, exist_ok=True) # Ensure the directory exists
     event_handler = PDFEventProcessor(folder_path=folder_path, socket=socket)
-    observer = Observer()
+    # Observer() picks the native event-driven backend (ReadDirectoryChangesW
+    # on Windows); the timeout only governs the backend's internal wait, so a
+    # larger value costs no latency on native backends but stops a polling
+    # fallback from walking the spool directory every second
+    observer = Observer(timeout=float(os.getenv("WATCH_TIMEOUT", "1")))
     observer.schedule(event_handler, path=folder_path, recursive=False)  # recursive=False if you only want the main folder
     observer.start()
+    # Sweep after the watch is live so nothing falls in the gap; a file that
+    # arrives during the sweep is simply queued twice and the rename-claim
+    # makes the second dispatch a no-op
+    event_handler.sweep_spool()
+
+    # Park the main thread on an Event; SIGINT (Ctrl+C) and SIGTERM (service
+    # stop) both set it. The wait must be timed: on Windows an untimed
+    # Event.wait() blocks in a non-interruptible lock acquire and the Python
+    # signal handler never gets a bytecode boundary to run on (bpo-35935),
+    # so Ctrl+C would be dead. A 1s timeout bounds signal latency instead
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
 
     try:
-        logger.info("Service started", folder_path=folder_path, script=sys.argv[0])
-        logger.info("Service started. Press Ctrl+C to stop.", script=sys.argv[0])
+        logger.info("Service started", folder_path=folder_path)
+        logger.info("Service started. Press Ctrl+C to stop.")
 
-        while True:
-            time.sleep(1)  # Keep the main thread alive
-        
-    except KeyboardInterrupt:
-        logger.info("Stopping services...", script=sys.argv[0])
+        while not stop.wait(timeout=1):
+            pass
+        logger.info("Stopping services...")
     finally:
         observer.stop()
         observer.join()
+        # Join the drain thread before touching the socket; it is the only
+        # sender and must not be mid-send when close()/term() run
+        event_handler.stop()
         socket.close()
         context.term()
-        logger.info("Services stopped cleanly.", script=sys.argv[0])
+        logger.info("Services stopped cleanly.")
 
 
 if __name__ == "__main__":